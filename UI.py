@@ -1,7 +1,9 @@
 import sys, re, os
+import time, threading, traceback, logging, logging.handlers
+from collections import deque
 from core import *
-from PySide6.QtCore import Qt, QSize, QTimer
-from PySide6.QtGui import QIcon, QColor, QTransform, QPixmap
+from PySide6.QtCore import Qt, QSize, QTimer, QObject
+from PySide6.QtGui import QIcon, QColor, QTransform, QPixmap, QKeySequence, QShortcut
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -32,11 +34,136 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-def get_db_path():
-    app_data_path = os.path.expanduser("~/.local/share/AssignmentManager")
-    if not os.path.exists(app_data_path):
-        os.makedirs(app_data_path)
-    return os.path.join(app_data_path, "assignments.db")
+def get_stall_log_path():
+    return os.path.join(os.path.dirname(get_db_path()), "stalls.log")
+
+
+class StallWatchdog(QObject):
+    """Measure event-loop latency and log stalls of the GUI thread.
+
+    A heartbeat QTimer records how late each tick fires. A background thread
+    notices when the heartbeat stops and samples the main thread's stack, so
+    the stall can be attributed to the handler that was running.
+    """
+
+    HEARTBEAT_MS = 50
+    STALL_MS = 250
+    SAMPLES = 1200
+    # a stall is credited to every one of these on the sampled stack,
+    # reported outermost first, e.g. "MainWindow.add_clicked > MainWindow.refresh"
+    HANDLERS = {
+        "MainWindow.refresh",
+        "MainWindow.rotate_refresh_icon",
+        "MainWindow.add_clicked",
+        "MainWindow.edit_clicked",
+        "MainWindow.delete_clicked",
+        "MainWindow.undo_clicked",
+        "MainWindow.redo_clicked",
+        "AddDialog.__init__",
+        "AddDialog.validate",
+        "EditDialog.__init__",
+    }
+
+    def __init__(self, parent=None, log_path=None):
+        super().__init__(parent)
+        self.latencies = deque(maxlen=self.SAMPLES)
+        self._main_ident = threading.get_ident()
+        self._beat_no = 0
+        self._last_beat = time.perf_counter()
+        self._sample = None
+
+        self.log = logging.getLogger("AssignmentManager.stalls")
+        self.log.setLevel(logging.INFO)
+        self.log.propagate = False
+        if not self.log.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                log_path or get_stall_log_path(),
+                maxBytes=256 * 1024,
+                backupCount=3,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.log.addHandler(handler)
+
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setTimerType(Qt.PreciseTimer)
+        self.heartbeat.timeout.connect(self.beat)
+
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._watch, name="stall-watchdog", daemon=True
+        )
+
+    def start(self):
+        self._last_beat = time.perf_counter()
+        self.heartbeat.start(self.HEARTBEAT_MS)
+        self._sampler.start()
+
+    def stop(self):
+        self.heartbeat.stop()
+        self._stopped.set()
+
+    def beat(self):
+        now = time.perf_counter()
+        latency = max(0.0, (now - self._last_beat) * 1000 - self.HEARTBEAT_MS)
+        self.latencies.append(latency)
+
+        sample = self._sample
+        if latency >= self.STALL_MS:
+            if sample is not None and sample[0] == self._beat_no:
+                handler, stack = sample[1], sample[2]
+            else:
+                handler, stack = "unknown", ""
+            self.log.warning(
+                "stall %.0f ms in %s\n%s", latency, handler, stack.rstrip()
+            )
+
+        # timestamp first, so the sampler never pairs a new beat with an old time
+        self._last_beat = now
+        self._beat_no += 1
+
+    def percentiles(self):
+        if not self.latencies:
+            return 0.0, 0.0
+        ordered = sorted(self.latencies)
+        p50 = ordered[len(ordered) // 2]
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return p50, p99
+
+    def _watch(self):
+        # runs off the GUI thread; only reads state the GUI thread publishes
+        while not self._stopped.wait(self.HEARTBEAT_MS / 1000):
+            beat_no = self._beat_no
+            overdue = (time.perf_counter() - self._last_beat) * 1000
+            if overdue - self.HEARTBEAT_MS < self.STALL_MS:
+                continue
+            if self._sample is not None and self._sample[0] == beat_no:
+                continue
+            frame = sys._current_frames().get(self._main_ident)
+            if frame is None:
+                continue
+            self._sample = (
+                beat_no,
+                self._attribute(frame),
+                "".join(traceback.format_stack(frame)),
+            )
+
+    def _attribute(self, frame):
+        # co_qualname (3.11+) avoids touching f_locals of a frame that is running;
+        # older versions read the owning class from `self`, for candidate frames only
+        bare = {h.rsplit(".", 1)[1] for h in self.HANDLERS}
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            qualname = getattr(code, "co_qualname", None)
+            if qualname is None and code.co_name in bare:
+                owner = type(frame.f_locals.get("self")).__name__
+                qualname = f"{owner}.{code.co_name}"
+            if qualname in self.HANDLERS:
+                names.append(qualname)
+            frame = frame.f_back
+        return " > ".join(reversed(names)) if names else "Qt (no Python handler)"
+
 
 class AddDialog(QDialog):
     def __init__(self, parent=None):
@@ -168,6 +295,22 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Assignment Manager")
         self.setMinimumSize(QSize(1000, 700))
 
+        # ---------- Watchdog ----------
+        self.watchdog = StallWatchdog(self)
+        # start once the event loop runs, so startup isn't logged as a stall
+        QTimer.singleShot(0, self.watchdog.start)
+        QApplication.instance().aboutToQuit.connect(self.watchdog.stop)
+
+        # debug overlay, toggled with F12
+        self.latency_overlay = QLabel(self)
+        self.latency_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 170); color: #86A660; padding: 4px;"
+        )
+        self.latency_overlay.hide()
+        self.overlay_timer = QTimer(self)
+        self.overlay_timer.timeout.connect(self.update_latency_overlay)
+        QShortcut(QKeySequence(Qt.Key_F12), self, self.toggle_latency_overlay)
+
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
 
@@ -182,17 +325,27 @@ class MainWindow(QMainWindow):
         self.btn_delete = QPushButton("Delete")
         self.btn_delete.setEnabled(False)
         self.btn_refresh = QPushButton("Refresh")
+        self.btn_undo = QPushButton("Undo")
+        self.btn_undo.setEnabled(False)
+        self.btn_undo.setShortcut(QKeySequence.Undo)
+        self.btn_redo = QPushButton("Redo")
+        self.btn_redo.setEnabled(False)
+        self.btn_redo.setShortcut(QKeySequence.Redo)
 
         button_layout.addWidget(self.btn_add)
         button_layout.addWidget(self.btn_edit)
         button_layout.addWidget(self.btn_delete)
         button_layout.addStretch()
+        button_layout.addWidget(self.btn_undo)
+        button_layout.addWidget(self.btn_redo)
         button_layout.addWidget(self.btn_refresh)
 
         self.btn_add.clicked.connect(self.add_clicked)
         self.btn_refresh.clicked.connect(self.refresh)
         self.btn_edit.clicked.connect(self.edit_clicked)
         self.btn_delete.clicked.connect(self.delete_clicked)
+        self.btn_undo.clicked.connect(self.undo_clicked)
+        self.btn_redo.clicked.connect(self.redo_clicked)
 
         self.btn_add.setIcon(QIcon(resource_path("icons/add.svg")))
         self.btn_add.setIconSize(QSize(20, 20))
@@ -250,6 +403,24 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.table)
         # self.placeholder.resize(self.table.size())
 
+    def toggle_latency_overlay(self):
+        if self.latency_overlay.isVisible():
+            self.overlay_timer.stop()
+            self.latency_overlay.hide()
+        else:
+            self.update_latency_overlay()
+            self.latency_overlay.show()
+            self.latency_overlay.raise_()
+            self.overlay_timer.start(1000)
+
+    def update_latency_overlay(self):
+        p50, p99 = self.watchdog.percentiles()
+        self.latency_overlay.setText(f"frame p50 {p50:.1f} ms | p99 {p99:.1f} ms")
+        self.latency_overlay.adjustSize()
+        self.latency_overlay.move(
+            self.width() - self.latency_overlay.width() - 10, 10
+        )
+
     def rotate_refresh_icon(self):
         transform = QTransform().rotate(self._rotation_angle)
         rotated = self.refresh_icon.transformed(transform, Qt.SmoothTransformation)
@@ -321,41 +492,91 @@ class MainWindow(QMainWindow):
                         )
 
                 for idx, ass in enumerate(all_assignments):
-                    iname = QTableWidgetItem(str(ass["name"]).upper())
-                    iname.setData(Qt.UserRole, ass["id"])
-                    self.table.setItem(idx, 0, iname)
-                    # self.table.setItem(idx, 1, QTableWidgetItem(ass['deadline']))
-                    self.table.setItem(idx, 1, QTableWidgetItem(ass["deadline_jalali"]))
-                    self.table.setItem(
-                        idx, 2, QTableWidgetItem("★" * int(ass["stars"]))
-                    )
+                    self._fill_row(idx, ass)
 
-                    jalali_deadline = JalaliDate.fromisoformat(ass["deadline_jalali"])
-                    greg_deadline = jalali_deadline.to_gregorian()
-                    today = datetime.date.today()
-
-                    remaining = (greg_deadline - today).days
-                    if remaining <= 3:
-                        fcolor = QColor("#e60909")
-                        bcolor = QColor("#360101")
-                    elif remaining <= 7:
-                        fcolor = QColor("#f7c705")
-                        bcolor = QColor("#403301")
-                    else:
-                        fcolor = None
-                        bcolor = None
-                    if fcolor:
-                        for col in range(self.table.columnCount()):
-                            self.table.item(idx, col).setForeground(fcolor)
-                            self.table.item(idx, col).setBackground(bcolor)
-                            if remaining < 3:
-                                self.table.item(idx, col).setToolTip(
-                                    f"Deadline in {remaining} day(s). Wake up engineer!"
-                                )
+                self._update_history_buttons(mgr)
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
         QTimer.singleShot(900, self.stop_refresh_animation)
 
+    def _fill_row(self, idx, ass):
+        iname = QTableWidgetItem(str(ass["name"]).upper())
+        iname.setData(Qt.UserRole, ass["id"])
+        self.table.setItem(idx, 0, iname)
+        # self.table.setItem(idx, 1, QTableWidgetItem(ass['deadline']))
+        ideadline = QTableWidgetItem(ass["deadline_jalali"])
+        ideadline.setData(Qt.UserRole, ass["deadline"])
+        self.table.setItem(idx, 1, ideadline)
+        self.table.setItem(idx, 2, QTableWidgetItem("★" * int(ass["stars"])))
+
+        jalali_deadline = JalaliDate.fromisoformat(ass["deadline_jalali"])
+        greg_deadline = jalali_deadline.to_gregorian()
+        today = datetime.date.today()
+
+        remaining = (greg_deadline - today).days
+        if remaining <= 3:
+            fcolor = QColor("#e60909")
+            bcolor = QColor("#360101")
+        elif remaining <= 7:
+            fcolor = QColor("#f7c705")
+            bcolor = QColor("#403301")
+        else:
+            fcolor = None
+            bcolor = None
+        if fcolor:
+            for col in range(self.table.columnCount()):
+                self.table.item(idx, col).setForeground(fcolor)
+                self.table.item(idx, col).setBackground(bcolor)
+                if remaining < 3:
+                    self.table.item(idx, col).setToolTip(
+                        f"Deadline in {remaining} day(s). Wake up engineer!"
+                    )
+
+    def _find_row(self, ass_id):
+        for idx in range(self.table.rowCount()):
+            if self.table.item(idx, 0).data(Qt.UserRole) == ass_id:
+                return idx
+        return -1
+
+    def _patch_row(self, ass_id, ass):
+        # keep the table ordered by deadline, like get_all() does
+        old_idx = self._find_row(ass_id)
+        if old_idx >= 0:
+            self.table.removeRow(old_idx)
+        if ass is not None:
+            idx = self.table.rowCount()
+            for row in range(self.table.rowCount()):
+                if self.table.item(row, 1).data(Qt.UserRole) > ass["deadline"]:
+                    idx = row
+                    break
+            self.table.insertRow(idx)
+            self._fill_row(idx, ass)
+        self.placeholder.setVisible(self.table.rowCount() == 0)
+        self.table.clearSelection()
+        self._last_selected_row = None
+
+    def _update_history_buttons(self, mgr):
+        self.btn_undo.setEnabled(mgr.can_undo())
+        self.btn_redo.setEnabled(mgr.can_redo())
+
+    def undo_clicked(self):
+        self._replay(lambda mgr: mgr.undo(), "Undone")
+
+    def redo_clicked(self):
+        self._replay(lambda mgr: mgr.redo(), "Redone")
+
+    def _replay(self, action, verb):
+        try:
+            with AssignmentManager(get_db_path()) as mgr:
+                change = action(mgr)
+                self._update_history_buttons(mgr)
+            self._patch_row(change["id"], change["row"])
+            self.statusBar().showMessage(f"{verb} {change['op']}, engineer.", 1500)
+        except AssignmentError as e:
+            QMessageBox.warning(self, "Warning", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+
     def edit_clicked(self):
         selected = self.table.currentRow()
 
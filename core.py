@@ -1,6 +1,9 @@
+import os
 import sqlite3
+import contextlib
 import datetime
-from typing import Optional, List, Dict, Any
+import json
+from typing import Optional, List, Dict, Any, Iterator
 
 _JALALI_AVAILABLE = False
 try:
@@ -31,6 +34,17 @@ class InvalidDateError(AssignmentError):
     pass
 
 
+class NothingToUndoError(AssignmentError):
+    pass
+
+
+class NothingToRedoError(AssignmentError):
+    pass
+
+
+JOURNAL_LIMIT = 200
+
+
 def _jalali_to_gregorian(jalali_date: str) -> str:
     if not _JALALI_AVAILABLE:
         raise InvalidDateError(
@@ -81,10 +95,19 @@ def _normalizing_deadline(deadline: str) -> str:
         )
 
 
+def get_db_path():
+    app_data_path = os.path.expanduser("~/.local/share/AssignmentManager")
+    if not os.path.exists(app_data_path):
+        os.makedirs(app_data_path)
+    return os.path.join(app_data_path, "assignments.db")
+
+
 class AssignmentManager:
-    def __init__(self, db_path: str = "assignments.db"):
+    def __init__(
+        self, db_path: str = "assignments.db", check_same_thread: bool = True
+    ):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
         self.conn.row_factory = sqlite3.Row
         self.cursor = self.conn.cursor()
         self.ensure_schema()
@@ -101,6 +124,17 @@ class AssignmentManager:
         self.cursor.execute(
             "CREATE INDEX IF NOT EXISTS idx_deadline ON assignments(deadline)"
         )
+        # before/after are JSON images of the row; undone=1 marks the redo stack
+        self.cursor.execute(
+            """CREATE TABLE IF NOT EXISTS journal (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            op TEXT NOT NULL,
+                            row_id INTEGER NOT NULL,
+                            before TEXT,
+                            after TEXT,
+                            undone INTEGER NOT NULL DEFAULT 0)
+        """
+        )
         self.conn.commit()
 
     def close(self):
@@ -122,19 +156,21 @@ class AssignmentManager:
 
         dl_iso = _normalizing_deadline(deadline)
         stars = int(stars) if stars is not None else 0
-        try:
-            self.cursor.execute(
-                "INSERT INTO assignments (name, deadline, stars) VALUES (?, ?, ?)",
-                (name, dl_iso, stars),
-            )
-            self.conn.commit()
-            return self.cursor.lastrowid
-        except sqlite3.IntegrityError as e:
-            if "UNIQUE" in str(e).upper():
-                raise DuplicateNameError(
-                    f"An assignment with name '{name!r}' already exists."
-                ) from e
-            raise
+        with self._write_transaction():
+            try:
+                self.cursor.execute(
+                    "INSERT INTO assignments (name, deadline, stars) VALUES (?, ?, ?)",
+                    (name, dl_iso, stars),
+                )
+            except sqlite3.IntegrityError as e:
+                if "UNIQUE" in str(e).upper():
+                    raise DuplicateNameError(
+                        f"An assignment with name '{name!r}' already exists."
+                    ) from e
+                raise
+            new_id = self.cursor.lastrowid
+            self._record("add", new_id, None, self._image(new_id))
+        return new_id
 
     def get_by_id(self, id_: int) -> Optional[Dict[str, any]]:
         r = self.cursor.execute(
@@ -143,22 +179,21 @@ class AssignmentManager:
         return self._row_to_dict(r) if r else None
 
     def get_all(self, ob: str = "deadline", asc: bool = True) -> List[Dict[str, any]]:
-        assert ob in ("deadline", "stars", "name", "id"), "unsupported order_by value"
-        asc_desc = "ASC" if asc else "DESC"
-        rows = self.cursor.execute(
-            f"SELECT * FROM assignments ORDER BY {ob} {asc_desc}"
-        ).fetchall()
-
+        rows = self.cursor.execute(*self._all_query(ob, asc)).fetchall()
         return [self._row_to_dict(r) for r in rows]
 
+    def iter_all(
+        self, ob: str = "deadline", asc: bool = True, size: int = 200
+    ) -> Iterator[List[Dict[str, Any]]]:
+        return self._iter_batches(self._all_query(ob, asc), size)
+
     def search(self, qry: str) -> List[Dict[str, any]]:
-        pattern = f"%{qry.strip()}%"
-        rows = self.cursor.execute(
-            "SELECT * FROM assignments WHERE name LIKE ? ORDER BY deadline ASC",
-            (pattern,),
-        ).fetchall()
+        rows = self.cursor.execute(*self._search_query(qry)).fetchall()
         return [self._row_to_dict(r) for r in rows]
 
+    def iter_search(self, qry: str, size: int = 200) -> Iterator[List[Dict[str, Any]]]:
+        return self._iter_batches(self._search_query(qry), size)
+
     def update_by_id(
         self,
         id_: int,
@@ -185,19 +220,60 @@ class AssignmentManager:
             return False
         params.append(id_)
         sql = f"UPDATE assignments SET {', '.join(fields)} WHERE id = ?"
-        try:
-            self.cursor.execute(sql, tuple(params))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
-        except sqlite3.IntegrityError as e:
-            if "UNIQUE" in str(e).upper():
-                raise DuplicateNameError("Name conflict during update.") from e
-            raise
+        with self._write_transaction():
+            before = self._image(id_)
+            if before is None:
+                return False
+            try:
+                self.cursor.execute(sql, tuple(params))
+            except sqlite3.IntegrityError as e:
+                if "UNIQUE" in str(e).upper():
+                    raise DuplicateNameError("Name conflict during update.") from e
+                raise
+            self._record("update", id_, before, self._image(id_))
+        return True
 
     def delete_by_id(self, id_: int) -> bool:
-        self.cursor.execute("DELETE FROM assignments WHERE id = ?", (id_,))
-        self.conn.commit()
-        return self.cursor.rowcount > 0
+        with self._write_transaction():
+            before = self._image(id_)
+            if before is None:
+                return False
+            self.cursor.execute("DELETE FROM assignments WHERE id = ?", (id_,))
+            self._record("delete", id_, before, None)
+        return True
+
+    def can_undo(self) -> bool:
+        return self._journal_entry(undone=False) is not None
+
+    def can_redo(self) -> bool:
+        return self._journal_entry(undone=True) is not None
+
+    def undo(self) -> Dict[str, Any]:
+        """Revert the latest journaled operation.
+
+        Returns ``{"op", "id", "row"}`` where ``row`` is the restored row
+        (or ``None`` if the row no longer exists), so callers can patch a
+        single row instead of reloading the whole table.
+        """
+        with self._write_transaction():
+            entry = self._journal_entry(undone=False)
+            if entry is None:
+                raise NothingToUndoError("Nothing to undo.")
+            self._apply_image(entry["row_id"], entry["before"])
+            return self._finish_replay(entry, undone=1)
+
+    def redo(self) -> Dict[str, Any]:
+        """Re-apply the most recently undone operation, see :meth:`undo`."""
+        with self._write_transaction():
+            entry = self._journal_entry(undone=True)
+            if entry is None:
+                raise NothingToRedoError("Nothing to redo.")
+            self._apply_image(entry["row_id"], entry["after"])
+            return self._finish_replay(entry, undone=0)
+
+    def data_version(self) -> int:
+        """Counter bumped by every journaled change, from any connection."""
+        return int(self.cursor.execute("PRAGMA user_version").fetchone()[0])
 
     def count(self) -> int:
         return int(
@@ -205,19 +281,148 @@ class AssignmentManager:
         )
 
     def get_upcoming(self, days: int = 7) -> List[Dict[str, Any]]:
-        today = datetime.date.today()
-        limit = today + datetime.timedelta(days=days)
-        rows = self.cursor.execute(
-            "SELECT * FROM assignments WHERE deadline BETWEEN ? AND ? ORDER BY deadline ASC",
-            (today.strftime("%Y-%m-%d"), limit.strftime("%Y-%m-%d")),
-        ).fetchall()
+        rows = self.cursor.execute(*self._upcoming_query(days)).fetchall()
         return [self._row_to_dict(r) for r in rows]
 
+    def iter_upcoming(
+        self, days: int = 7, size: int = 200
+    ) -> Iterator[List[Dict[str, Any]]]:
+        return self._iter_batches(self._upcoming_query(days), size)
+
     @staticmethod
     def days_remaining_from_iso(iso_date_str: str) -> int:
         d = datetime.datetime.strptime(iso_date_str, "%Y-%m-%d").date()
         return (d - datetime.date.today()).days
 
+    @staticmethod
+    def _all_query(ob: str, asc: bool):
+        assert ob in ("deadline", "stars", "name", "id"), "unsupported order_by value"
+        asc_desc = "ASC" if asc else "DESC"
+        return f"SELECT * FROM assignments ORDER BY {ob} {asc_desc}", ()
+
+    @staticmethod
+    def _search_query(qry: str):
+        pattern = f"%{qry.strip()}%"
+        return (
+            "SELECT * FROM assignments WHERE name LIKE ? ORDER BY deadline ASC",
+            (pattern,),
+        )
+
+    @staticmethod
+    def _upcoming_query(days: int):
+        today = datetime.date.today()
+        limit = today + datetime.timedelta(days=days)
+        return (
+            "SELECT * FROM assignments WHERE deadline BETWEEN ? AND ? ORDER BY deadline ASC",
+            (today.strftime("%Y-%m-%d"), limit.strftime("%Y-%m-%d")),
+        )
+
+    def _iter_batches(self, query, size: int) -> Iterator[List[Dict[str, Any]]]:
+        # own cursor, so other calls on this manager don't reset the iteration
+        cursor = self.conn.execute(*query)
+        try:
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    return
+                yield [self._row_to_dict(r) for r in rows]
+        finally:
+            cursor.close()
+
+    def _begin_write(self):
+        # take the write lock up front so before-images and journal lookups
+        # can't be invalidated by another connection committing in between
+        if not self.conn.in_transaction:
+            self.cursor.execute("BEGIN IMMEDIATE")
+
+    @contextlib.contextmanager
+    def _write_transaction(self):
+        # commit everything in the block together, or none of it
+        self._begin_write()
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    def _image(self, id_: int) -> Optional[Dict[str, Any]]:
+        r = self.cursor.execute(
+            "SELECT id, name, deadline, stars FROM assignments WHERE id = ?", (id_,)
+        ).fetchone()
+        return dict(r) if r else None
+
+    def _record(self, op: str, row_id: int, before, after):
+        # a new operation invalidates whatever was waiting to be redone
+        self.cursor.execute("DELETE FROM journal WHERE undone = 1")
+        self.cursor.execute(
+            "INSERT INTO journal (op, row_id, before, after) VALUES (?, ?, ?, ?)",
+            (
+                op,
+                row_id,
+                json.dumps(before) if before is not None else None,
+                json.dumps(after) if after is not None else None,
+            ),
+        )
+        self._compact_journal()
+        self._bump_version()
+
+    def _bump_version(self):
+        # runs inside the write transaction, so the bump commits with the change
+        self.cursor.execute(f"PRAGMA user_version = {self.data_version() + 1}")
+
+    def _compact_journal(self):
+        self.cursor.execute(
+            """DELETE FROM journal WHERE id NOT IN (
+                   SELECT id FROM journal ORDER BY id DESC LIMIT ?)""",
+            (JOURNAL_LIMIT,),
+        )
+
+    def _journal_entry(self, undone: bool) -> Optional[Dict[str, Any]]:
+        # undo walks back from the newest entry, redo forward from the oldest undone one
+        order = "ASC" if undone else "DESC"
+        r = self.cursor.execute(
+            f"SELECT * FROM journal WHERE undone = ? ORDER BY id {order} LIMIT 1",
+            (int(undone),),
+        ).fetchone()
+        if r is None:
+            return None
+        entry = dict(r)
+        for key in ("before", "after"):
+            entry[key] = json.loads(entry[key]) if entry[key] is not None else None
+        return entry
+
+    def _apply_image(self, row_id: int, image: Optional[Dict[str, Any]]):
+        try:
+            if image is None:
+                self.cursor.execute("DELETE FROM assignments WHERE id = ?", (row_id,))
+            elif self._image(row_id) is not None:
+                self.cursor.execute(
+                    "UPDATE assignments SET name = :name, deadline = :deadline, "
+                    "stars = :stars WHERE id = :id",
+                    image,
+                )
+            else:
+                self.cursor.execute(
+                    "INSERT INTO assignments (id, name, deadline, stars) "
+                    "VALUES (:id, :name, :deadline, :stars)",
+                    image,
+                )
+        except sqlite3.IntegrityError as e:
+            if "UNIQUE" in str(e).upper():
+                raise DuplicateNameError(
+                    f"An assignment with name '{image['name']!r}' already exists."
+                ) from e
+            raise
+
+    def _finish_replay(self, entry: Dict[str, Any], undone: int) -> Dict[str, Any]:
+        self.cursor.execute(
+            "UPDATE journal SET undone = ? WHERE id = ?", (undone, entry["id"])
+        )
+        self._bump_version()
+        row = self.get_by_id(entry["row_id"])
+        return {"op": entry["op"], "id": entry["row_id"], "row": row}
+
     def _row_to_dict(self, r):
         d = dict(r)
         try:
@@ -0,0 +1,522 @@
+import re
+import sys
+import json
+import asyncio
+import argparse
+import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from core import (
+    AssignmentManager,
+    AssignmentError,
+    DuplicateNameError,
+    NothingToUndoError,
+    NothingToRedoError,
+    get_db_path,
+)
+
+STREAM_BATCH = 200
+MAX_BODY = 1 << 20
+# seconds a client may take to send its request, or to accept one chunk
+REQUEST_TIMEOUT = 10.0
+WRITE_TIMEOUT = 10.0
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AssignmentServer:
+    """Serve AssignmentManager operations as JSON over local HTTP.
+
+    Reads go through a bounded pool of connections, writes through a single
+    connection on its own thread. GET responses are cached until the
+    database's data version changes, whoever changed it; the version is read
+    on a connection of its own, so cache hits never wait for the pool.
+    Listings longer than STREAM_BATCH rows are streamed from the cursor and
+    not cached.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 4, cache_size: int = 64):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.cache_size = cache_size
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_slots: List[Tuple[AssignmentManager, ThreadPoolExecutor]] = []
+        self._writer: Optional[AssignmentManager] = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._versions: Optional[AssignmentManager] = None
+        self._version_executor: Optional[ThreadPoolExecutor] = None
+        self._cache: "OrderedDict[str, Tuple[int, List[bytes]]]" = OrderedDict()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._routes = [
+            ("GET", re.compile(r"^/version$"), self._get_version),
+            ("GET", re.compile(r"^/count$"), self._get_count),
+            ("GET", re.compile(r"^/assignments$"), self._list_assignments),
+            ("GET", re.compile(r"^/assignments/(\d+)$"), self._get_assignment),
+            ("GET", re.compile(r"^/search$"), self._search),
+            ("GET", re.compile(r"^/upcoming$"), self._upcoming),
+            ("POST", re.compile(r"^/assignments$"), self._add),
+            ("PATCH", re.compile(r"^/assignments/(\d+)$"), self._update),
+            ("DELETE", re.compile(r"^/assignments/(\d+)$"), self._delete),
+            ("POST", re.compile(r"^/undo$"), self._undo),
+            ("POST", re.compile(r"^/redo$"), self._redo),
+        ]
+
+    # ---------- lifecycle ----------
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None
+    ):
+        # the writer creates the schema before any reader touches the file
+        self._write_executor = ThreadPoolExecutor(max_workers=1)
+        self._writer = await self._on_writer(AssignmentManager, self.db_path)
+        # WAL lets the writer commit while a reader is still streaming a listing
+        await self._write(
+            lambda mgr: mgr.conn.execute("PRAGMA journal_mode=WAL").fetchone()
+        )
+        self._version_executor = ThreadPoolExecutor(max_workers=1)
+        self._versions = await _on(
+            self._version_executor, AssignmentManager, self.db_path
+        )
+        # each reader owns one thread, so work on its connection runs in order
+        # even if the request that queued it was cancelled meanwhile
+        self._readers = asyncio.Queue(maxsize=self.pool_size)
+        for _ in range(self.pool_size):
+            executor = ThreadPoolExecutor(max_workers=1)
+            mgr = await _on(executor, AssignmentManager, self.db_path)
+            self._reader_slots.append((mgr, executor))
+            self._readers.put_nowait((mgr, executor))
+
+        if unix_path:
+            self._server = await asyncio.start_unix_server(
+                self._handle, path=unix_path
+            )
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for mgr, executor in self._reader_slots:
+            await _on(executor, mgr.close)
+            executor.shutdown()
+        self._reader_slots = []
+        if self._versions is not None:
+            await _on(self._version_executor, self._versions.close)
+            self._version_executor.shutdown()
+            self._versions = None
+        if self._writer is not None:
+            await self._on_writer(self._writer.close)
+            self._writer = None
+        if self._write_executor is not None:
+            self._write_executor.shutdown()
+
+    # ---------- database access ----------
+
+    async def _on_writer(self, fn, *args):
+        return await _on(self._write_executor, fn, *args)
+
+    async def _write(self, fn, *args):
+        return await self._on_writer(lambda: fn(self._writer, *args))
+
+    async def _version(self) -> int:
+        return await _on(self._version_executor, self._versions.data_version)
+
+    async def _read(self, key: str, fn) -> List[bytes]:
+        version = await self._version()
+        cached = self._cached(key, version)
+        if cached is not None:
+            return cached
+
+        mgr, executor = await self._readers.get()
+        try:
+            chunks = await _on(executor, fn, mgr)
+        finally:
+            self._readers.put_nowait((mgr, executor))
+
+        self._store(key, version, chunks)
+        return chunks
+
+    async def _read_rows(self, key: str, make_batches):
+        """Return cached chunks for short listings, or an async stream.
+
+        The stream keeps its pooled connection until it is exhausted or closed.
+        """
+        version = await self._version()
+        cached = self._cached(key, version)
+        if cached is not None:
+            return cached
+
+        mgr, executor = await self._readers.get()
+        batches = None
+        handed_off = False
+        try:
+            batches = make_batches(mgr, STREAM_BATCH)
+            first = await _on(executor, next, batches, [])
+            if len(first) < STREAM_BATCH:
+                chunks = [b"[" + _join_rows(first) + b"]"]
+                self._store(key, version, chunks)
+                return chunks
+            handed_off = True
+            return self._stream_rows(mgr, executor, batches, first)
+        finally:
+            if not handed_off:
+                self._release(mgr, executor, batches)
+
+    async def _stream_rows(self, mgr, executor, batches, first):
+        try:
+            yield b"[" + _join_rows(first)
+            while True:
+                batch = await _on(executor, next, batches, None)
+                if batch is None:
+                    break
+                yield b"," + _join_rows(batch)
+            yield b"]"
+        finally:
+            self._release(mgr, executor, batches)
+
+    def _release(self, mgr, executor, batches):
+        # queued behind any batch still being fetched, and ahead of the next
+        # borrower's work, so the cursor is closed on its own thread in order
+        if batches is not None:
+            executor.submit(batches.close)
+        self._readers.put_nowait((mgr, executor))
+
+    def _cached(self, key: str, version: int) -> Optional[List[bytes]]:
+        cached = self._cache.get(key)
+        if cached is None or cached[0] != version:
+            return None
+        self._cache.move_to_end(key)
+        return cached[1]
+
+    def _store(self, key: str, version: int, chunks: List[bytes]):
+        self._cache[key] = (version, chunks)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # ---------- handlers ----------
+
+    async def _get_version(self, key, query):
+        return await self._read(key, lambda mgr: _encode(mgr.data_version()))
+
+    async def _get_count(self, key, query):
+        return await self._read(key, lambda mgr: _encode(mgr.count()))
+
+    async def _list_assignments(self, key, query):
+        ob = query.get("order_by", "deadline")
+        if ob not in ("deadline", "stars", "name", "id"):
+            raise HTTPError(400, f"unsupported order_by value: {ob!r}")
+        asc = query.get("asc", "1") not in ("0", "false")
+        return await self._read_rows(
+            key, lambda mgr, size: mgr.iter_all(ob, asc, size)
+        )
+
+    async def _get_assignment(self, key, query, id_):
+        chunks = await self._read(key, lambda mgr: _encode(mgr.get_by_id(int(id_))))
+        if chunks == [b"null"]:
+            raise HTTPError(404, f"No assignment with id {id_}")
+        return chunks
+
+    async def _search(self, key, query):
+        qry = query.get("q", "")
+        return await self._read_rows(key, lambda mgr, size: mgr.iter_search(qry, size))
+
+    async def _upcoming(self, key, query):
+        try:
+            days = int(query.get("days", 7))
+        except ValueError:
+            raise HTTPError(400, "days must be an integer")
+        # the window moves at midnight even when nothing is written
+        return await self._read_rows(
+            f"{key}@{datetime.date.today().isoformat()}",
+            lambda mgr, size: mgr.iter_upcoming(days, size),
+        )
+
+    async def _add(self, body):
+        if "name" not in body or "deadline" not in body:
+            raise HTTPError(400, "name and deadline are required")
+        _check_fields(body)
+
+        # write and read back as one job, so no other write lands in between
+        def add(mgr):
+            new_id = mgr.add(body["name"], body["deadline"], body.get("stars", 0))
+            return mgr.get_by_id(new_id)
+
+        return 201, await self._write(add)
+
+    async def _update(self, body, id_):
+        if all(body.get(k) is None for k in ("name", "deadline", "stars")):
+            raise HTTPError(400, "nothing to update")
+        _check_fields(body)
+
+        def update(mgr):
+            updated = mgr.update_by_id(
+                int(id_), body.get("name"), body.get("deadline"), body.get("stars")
+            )
+            return mgr.get_by_id(int(id_)) if updated else None
+
+        row = await self._write(update)
+        if row is None:
+            raise HTTPError(404, f"No assignment with id {id_}")
+        return 200, row
+
+    async def _delete(self, body, id_):
+        if not await self._write(AssignmentManager.delete_by_id, int(id_)):
+            raise HTTPError(404, f"No assignment with id {id_}")
+        return 200, {"id": int(id_)}
+
+    async def _undo(self, body):
+        return 200, await self._write(AssignmentManager.undo)
+
+    async def _redo(self, body):
+        return 200, await self._write(AssignmentManager.redo)
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader, writer):
+        try:
+            method, target, body = await _read_request(reader)
+            await self._dispatch(writer, method, target, body)
+        except ConnectionError:
+            # the client is gone or stalled, there is nobody to answer
+            pass
+        except HTTPError as e:
+            await _respond(writer, e.status, _encode({"error": str(e)}))
+        except (DuplicateNameError, NothingToUndoError, NothingToRedoError) as e:
+            await _respond(writer, 409, _encode({"error": str(e)}))
+        except (AssignmentError, ValueError, TypeError) as e:
+            await _respond(writer, 400, _encode({"error": str(e)}))
+        except Exception as e:
+            await _respond(writer, 500, _encode({"error": str(e)}))
+        finally:
+            writer.close()
+
+    async def _dispatch(self, writer, method, target, body):
+        url = urlsplit(target)
+        path_matched = False
+        for route_method, pattern, handler in self._routes:
+            m = pattern.match(url.path)
+            if m is None:
+                continue
+            path_matched = True
+            if route_method != method:
+                continue
+            if method == "GET":
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                chunks = await handler(target, query, *m.groups())
+                if isinstance(chunks, list):
+                    await _respond(writer, 200, chunks)
+                else:
+                    await _respond_stream(writer, 200, chunks)
+            else:
+                payload = json.loads(body) if body else {}
+                if not isinstance(payload, dict):
+                    raise HTTPError(400, "request body must be a JSON object")
+                status, result = await handler(payload, *m.groups())
+                await _respond(writer, status, _encode(result))
+            return
+        if path_matched:
+            raise HTTPError(405, f"{method} not allowed on {url.path}")
+        raise HTTPError(404, f"No route for {url.path}")
+
+
+def _encode(value) -> List[bytes]:
+    return [json.dumps(value, ensure_ascii=False).encode("utf-8")]
+
+
+def _join_rows(rows: List[Dict[str, Any]]) -> bytes:
+    return ",".join(json.dumps(r, ensure_ascii=False) for r in rows).encode("utf-8")
+
+
+def _check_fields(body: Dict[str, Any]):
+    for key in ("name", "deadline"):
+        if body.get(key) is not None and not isinstance(body[key], str):
+            raise HTTPError(400, f"{key} must be a string")
+    stars = body.get("stars")
+    if stars is not None and (isinstance(stars, bool) or not isinstance(stars, int)):
+        raise HTTPError(400, "stars must be an integer")
+
+
+async def _on(executor, fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, fn, *args)
+
+
+async def _read_request(reader) -> Tuple[str, str, bytes]:
+    try:
+        return await asyncio.wait_for(_parse_request(reader), REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ConnectionError("client took too long to send its request")
+
+
+async def _parse_request(reader) -> Tuple[str, str, bytes]:
+    request_line = await reader.readline()
+    if not request_line:
+        raise ConnectionError("client closed the connection")
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, body
+
+
+def _head(status: int, *extra: str) -> bytes:
+    head = [
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        "Connection: close",
+        *extra,
+    ]
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1")
+
+
+async def _drain(writer):
+    try:
+        await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+    except asyncio.TimeoutError:
+        writer.transport.abort()
+        raise ConnectionError("client stopped reading the response")
+
+
+async def _respond(writer, status: int, chunks: List[bytes]):
+    body = b"".join(chunks)
+    try:
+        writer.write(_head(status, f"Content-Length: {len(body)}") + body)
+        await _drain(writer)
+    except ConnectionError:
+        pass
+
+
+async def _respond_stream(writer, status: int, chunks):
+    try:
+        writer.write(_head(status, "Transfer-Encoding: chunked"))
+        async for chunk in chunks:
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            await _drain(writer)
+        writer.write(b"0\r\n\r\n")
+        await _drain(writer)
+    except Exception:
+        # the status line is already out; cut the stream so the client
+        # sees a truncated body instead of an error glued onto the JSON
+        writer.transport.abort()
+        raise ConnectionError("listing stream aborted")
+    finally:
+        await chunks.aclose()
+
+
+async def request(
+    method: str,
+    path: str,
+    body: Optional[Dict[str, Any]] = None,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_path: Optional[str] = None,
+) -> Tuple[int, Any]:
+    """Minimal client for AssignmentServer, returns ``(status, decoded JSON)``."""
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        writer.write(
+            (
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n"
+            ).encode("latin-1")
+            + payload
+        )
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding") == "chunked":
+            data = b""
+            while True:
+                size = int((await reader.readline()).strip(), 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                data += await reader.readexactly(size)
+                await reader.readline()
+        else:
+            data = await reader.readexactly(int(headers.get("content-length", 0)))
+        return status, json.loads(data) if data else None
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Assignment Manager service")
+    parser.add_argument("--db", default=None, help="database path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="serve on a Unix socket instead")
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = AssignmentServer(args.db or get_db_path(), pool_size=args.pool_size)
+        await server.start(args.host, args.port, args.unix)
+        print(f"Serving on {server.address}", file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
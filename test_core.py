@@ -0,0 +1,153 @@
+import sqlite3
+
+import pytest
+
+import core
+from core import (
+    AssignmentManager,
+    DuplicateNameError,
+    NothingToUndoError,
+    NothingToRedoError,
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "assignments.db")
+
+
+@pytest.fixture
+def mgr(db_path):
+    with AssignmentManager(db_path) as m:
+        yield m
+
+
+def _rows(mgr):
+    return [(r["id"], r["name"], r["stars"]) for r in mgr.get_all("id")]
+
+
+def test_undo_redo_round_trip(mgr):
+    a = mgr.add("a", "2030-01-01", 1)
+    b = mgr.add("b", "2030-02-01", 2)
+    mgr.update_by_id(a, stars=5)
+    mgr.delete_by_id(b)
+    assert _rows(mgr) == [(a, "a", 5)]
+
+    assert mgr.undo() == {
+        "op": "delete",
+        "id": b,
+        "row": mgr.get_by_id(b),
+    }
+    assert mgr.undo()["row"]["stars"] == 1
+    assert _rows(mgr) == [(a, "a", 1), (b, "b", 2)]
+
+    assert mgr.redo()["op"] == "update"
+    assert mgr.redo() == {"op": "delete", "id": b, "row": None}
+    assert _rows(mgr) == [(a, "a", 5)]
+    with pytest.raises(NothingToRedoError):
+        mgr.redo()
+
+
+def test_undo_add_and_empty_journal(mgr):
+    a = mgr.add("a", "2030-01-01")
+    assert mgr.undo() == {"op": "add", "id": a, "row": None}
+    assert mgr.count() == 0
+    with pytest.raises(NothingToUndoError):
+        mgr.undo()
+    assert not mgr.conn.in_transaction
+
+
+def test_new_operation_drops_redo(mgr):
+    mgr.add("a", "2030-01-01")
+    mgr.undo()
+    assert mgr.can_redo()
+    mgr.add("b", "2030-01-01")
+    assert not mgr.can_redo()
+
+
+def test_failed_operation_is_not_journaled(mgr):
+    mgr.add("a", "2030-01-01")
+    with pytest.raises(DuplicateNameError):
+        mgr.add("a", "2030-01-01")
+    assert mgr.update_by_id(99, stars=1) is False
+    assert mgr.delete_by_id(99) is False
+    assert mgr.cursor.execute("SELECT COUNT(*) FROM journal").fetchone()[0] == 1
+
+
+def test_undo_delete_conflicting_name(mgr):
+    a = mgr.add("a", "2030-01-01")
+    mgr.delete_by_id(a)
+    mgr.conn.execute(
+        "INSERT INTO assignments (name, deadline) VALUES ('a', '2030-02-01')"
+    )
+    mgr.conn.commit()
+    with pytest.raises(DuplicateNameError):
+        mgr.undo()
+    assert not mgr.conn.in_transaction
+    assert mgr.get_by_id(a) is None
+    assert mgr.can_undo()
+
+
+def test_journal_is_capped(mgr, monkeypatch):
+    monkeypatch.setattr(core, "JOURNAL_LIMIT", 3)
+    for i in range(5):
+        mgr.add(f"a{i}", "2030-01-01")
+    assert mgr.cursor.execute("SELECT COUNT(*) FROM journal").fetchone()[0] == 3
+    for _ in range(3):
+        mgr.undo()
+    assert not mgr.can_undo()
+    assert mgr.count() == 2
+
+
+def test_undo_keeps_change_from_other_connection(db_path, mgr):
+    a = mgr.add("a", "2030-01-01", 1)
+    with AssignmentManager(db_path) as other:
+        other.update_by_id(a, name="b")
+    mgr.update_by_id(a, stars=2)
+    assert mgr.undo()["row"]["name"] == "b"
+
+
+def test_write_lock_covers_before_image(db_path, mgr):
+    a = mgr.add("a", "2030-01-01", 1)
+    mgr._begin_write()
+    with AssignmentManager(db_path) as other:
+        other.conn.execute("PRAGMA busy_timeout = 50")
+        with pytest.raises(sqlite3.OperationalError):
+            other.update_by_id(a, name="b")
+    mgr.conn.rollback()
+
+
+def test_data_version_bumps_on_every_change(db_path, mgr):
+    with AssignmentManager(db_path) as other:
+        start = other.data_version()
+        a = mgr.add("a", "2030-01-01")
+        mgr.update_by_id(a, stars=3)
+        mgr.undo()
+        assert other.data_version() == start + 3
+
+
+@pytest.mark.parametrize("op", ["add", "update", "delete", "undo"])
+def test_failure_mid_write_rolls_back(db_path, monkeypatch, op):
+    with AssignmentManager(db_path) as mgr:
+        a = mgr.add("a", "2030-01-01", 1)
+
+        def broken(*args):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(mgr, "_record", broken)
+        monkeypatch.setattr(mgr, "_bump_version", broken)
+        with pytest.raises(sqlite3.OperationalError):
+            if op == "add":
+                mgr.add("b", "2030-01-01")
+            elif op == "update":
+                mgr.update_by_id(a, stars=5)
+            elif op == "delete":
+                mgr.delete_by_id(a)
+            else:
+                mgr.undo()
+        assert not mgr.conn.in_transaction
+    # close() commits, so anything left open would show up here
+    with AssignmentManager(db_path) as mgr:
+        assert _rows(mgr) == [(a, "a", 1)]
+        assert mgr.cursor.execute("SELECT COUNT(*) FROM journal").fetchone()[0] == 1
+        assert mgr.data_version() == 1
@@ -0,0 +1,253 @@
+import asyncio
+
+import pytest
+
+import server
+from core import AssignmentManager
+from server import AssignmentServer, request
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "assignments.db")
+
+
+def run_with_server(db_path, scenario, **kwargs):
+    async def main():
+        # connection handlers must not leak exceptions into the loop
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: errors.append(context)
+        )
+        srv = AssignmentServer(db_path, pool_size=2)
+        await srv.start(port=0, **kwargs)
+        try:
+            if kwargs.get("unix_path"):
+                call = lambda *a, **k: request(*a, unix_path=kwargs["unix_path"], **k)
+            else:
+                call = lambda *a, **k: request(*a, port=srv.address[1], **k)
+            result = await scenario(srv, call)
+        finally:
+            await srv.close()
+        assert errors == []
+        return result
+
+    return asyncio.run(main())
+
+
+def test_crud_round_trip(db_path):
+    async def scenario(srv, call):
+        status, created = await call(
+            "POST", "/assignments", {"name": "a", "deadline": "2030-01-01", "stars": 2}
+        )
+        assert status == 201
+        id_ = created["id"]
+        assert await call("GET", f"/assignments/{id_}") == (200, created)
+
+        status, updated = await call("PATCH", f"/assignments/{id_}", {"stars": 5})
+        assert (status, updated["stars"]) == (200, 5)
+        assert await call("GET", "/count") == (200, 1)
+
+        assert await call("DELETE", f"/assignments/{id_}") == (200, {"id": id_})
+        assert await call("GET", "/assignments") == (200, [])
+
+        status, undone = await call("POST", "/undo")
+        assert (status, undone["op"], undone["row"]["stars"]) == (200, "delete", 5)
+        status, redone = await call("POST", "/redo")
+        assert (status, redone["row"]) == (200, None)
+
+    run_with_server(db_path, scenario)
+
+
+def test_error_statuses(db_path):
+    async def scenario(srv, call):
+        await call("POST", "/assignments", {"name": "a", "deadline": "2030-01-01"})
+        assert (await call("GET", "/assignments/99"))[0] == 404
+        assert (await call("DELETE", "/assignments/99"))[0] == 404
+        assert (await call("GET", "/nope"))[0] == 404
+        assert (await call("PUT", "/count"))[0] == 405
+        dup = {"name": "a", "deadline": "2030-01-01"}
+        assert (await call("POST", "/assignments", dup))[0] == 409
+        assert (await call("POST", "/redo"))[0] == 409
+        bad_date = {"name": "b", "deadline": "soon"}
+        assert (await call("POST", "/assignments", bad_date))[0] == 400
+        assert (await call("GET", "/assignments?order_by=drop"))[0] == 400
+
+    run_with_server(db_path, scenario)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"name": 5, "deadline": "2030-01-01"},
+        {"name": "a", "deadline": 20300101},
+        {"name": "a", "deadline": "2030-01-01", "stars": "3"},
+        {"name": "a", "deadline": "2030-01-01", "stars": True},
+    ],
+)
+def test_field_types_are_checked(db_path, body):
+    async def scenario(srv, call):
+        assert (await call("POST", "/assignments", body))[0] == 400
+        assert (await call("PATCH", "/assignments/1", body))[0] == 400
+
+    run_with_server(db_path, scenario)
+
+
+def test_cache_invalidated_by_other_connection(db_path):
+    async def scenario(srv, call):
+        await call("POST", "/assignments", {"name": "a", "deadline": "2030-01-01"})
+        assert await call("GET", "/count") == (200, 1)
+
+        # an unjournaled change leaves the version alone, so the cache answers
+        with AssignmentManager(db_path) as mgr:
+            mgr.conn.execute("DELETE FROM assignments")
+            mgr.conn.commit()
+        assert await call("GET", "/count") == (200, 1)
+
+        with AssignmentManager(db_path) as mgr:
+            mgr.add("b", "2030-01-01")
+            mgr.add("c", "2030-01-01")
+        assert await call("GET", "/count") == (200, 2)
+
+    run_with_server(db_path, scenario)
+
+
+def test_large_listing_is_streamed(db_path, monkeypatch):
+    monkeypatch.setattr(server, "STREAM_BATCH", 2)
+
+    async def scenario(srv, call):
+        for i in range(5):
+            body = {"name": f"a{i}", "deadline": "2030-01-01"}
+            await call("POST", "/assignments", body)
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", srv.address[1])
+        writer.write(b"GET /assignments?order_by=id HTTP/1.1\r\n\r\n")
+        raw = await reader.read()
+        writer.close()
+        assert b"Transfer-Encoding: chunked" in raw
+
+        status, rows = await call("GET", "/assignments?order_by=id")
+        assert status == 200
+        assert [r["name"] for r in rows] == [f"a{i}" for i in range(5)]
+        assert "/assignments?order_by=id" not in srv._cache
+
+        status, rows = await call("GET", "/search?q=a1")
+        assert [r["name"] for r in rows] == ["a1"]
+        assert "/search?q=a1" in srv._cache
+
+        # every streamed listing gave its reader back to the pool
+        assert srv._readers.qsize() == srv.pool_size
+
+    run_with_server(db_path, scenario)
+
+
+def test_unix_socket(db_path, tmp_path):
+    async def scenario(srv, call):
+        assert await call("GET", "/count") == (200, 0)
+        assert (await call("GET", "/upcoming?days=x"))[0] == 400
+
+    run_with_server(db_path, scenario, unix_path=str(tmp_path / "server.sock"))
+
+
+def test_upcoming_cache_follows_the_date(db_path, monkeypatch):
+    import datetime
+
+    real_today = datetime.date.today()
+
+    class FakeDate(datetime.date):
+        current = real_today
+
+        @classmethod
+        def today(cls):
+            return cls.current
+
+    monkeypatch.setattr(datetime, "date", FakeDate)
+    deadline = (real_today + datetime.timedelta(days=3)).isoformat()
+
+    async def scenario(srv, call):
+        await call("POST", "/assignments", {"name": "a", "deadline": deadline})
+        assert len((await call("GET", "/upcoming?days=7"))[1]) == 1
+        FakeDate.current = real_today + datetime.timedelta(days=10)
+        assert (await call("GET", "/upcoming?days=7"))[1] == []
+
+    run_with_server(db_path, scenario)
+
+
+def test_patch_with_only_nulls_is_rejected(db_path):
+    async def scenario(srv, call):
+        await call("POST", "/assignments", {"name": "a", "deadline": "2030-01-01"})
+        assert (await call("PATCH", "/assignments/1", {"name": None}))[0] == 400
+
+    run_with_server(db_path, scenario)
+
+
+def test_add_returns_its_own_row_under_concurrent_deletes(db_path):
+    async def scenario(srv, call):
+        for _ in range(3):
+            results = await asyncio.gather(
+                call("POST", "/assignments", {"name": "a", "deadline": "2030-01-01"}),
+                *[call("DELETE", f"/assignments/{i}") for i in range(1, 10)],
+            )
+            status, row = results[0]
+            assert status == 201 and row["name"] == "a"
+            await call("DELETE", f"/assignments/{row['id']}")
+
+    run_with_server(db_path, scenario)
+
+
+def test_client_that_closes_early_is_ignored(db_path):
+    async def scenario(srv, call):
+        reader, writer = await asyncio.open_connection("127.0.0.1", srv.address[1])
+        writer.close()
+        await asyncio.sleep(0.05)
+        assert await call("GET", "/count") == (200, 0)
+
+    run_with_server(db_path, scenario)
+
+
+def test_silent_client_times_out(db_path, monkeypatch):
+    monkeypatch.setattr(server, "REQUEST_TIMEOUT", 0.1)
+
+    async def scenario(srv, call):
+        reader, writer = await asyncio.open_connection("127.0.0.1", srv.address[1])
+        assert await asyncio.wait_for(reader.read(), 2) == b""
+        writer.close()
+
+    run_with_server(db_path, scenario)
+
+
+def test_stalled_streams_do_not_block_reads(db_path, monkeypatch):
+    monkeypatch.setattr(server, "WRITE_TIMEOUT", 0.3)
+    with AssignmentManager(db_path) as mgr:
+        mgr.add("first", "2030-01-01")
+        mgr.cursor.executemany(
+            "INSERT INTO assignments (name, deadline) VALUES (?, '2030-01-01')",
+            ((f"{i:06d}" + "x" * 300,) for i in range(40000)),
+        )
+
+    async def scenario(srv, call):
+        assert await call("GET", "/count") == (200, 40001)
+
+        # as many clients as the pool has readers ask for the full listing
+        # and never read a byte of it
+        stalled = []
+        for _ in range(srv.pool_size):
+            reader, writer = await asyncio.open_connection(
+                "127.0.0.1", srv.address[1]
+            )
+            writer.write(b"GET /assignments HTTP/1.1\r\n\r\n")
+            stalled.append(writer)
+        await asyncio.sleep(0.1)
+        assert srv._readers.qsize() == 0
+
+        # cached answers don't need a reader
+        assert await asyncio.wait_for(call("GET", "/count"), 0.2) == (200, 40001)
+
+        # once the stalled streams time out their readers go back to the pool
+        status, rows = await asyncio.wait_for(call("GET", "/search?q=first"), 2)
+        assert (status, len(rows)) == (200, 1)
+        assert srv._readers.qsize() == srv.pool_size
+        for writer in stalled:
+            writer.close()
+
+    run_with_server(db_path, scenario)